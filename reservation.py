@@ -1,21 +1,41 @@
 # app.py
 import os
 import json
+import asyncio
 import sqlite3
-import uuid
-from typing import List, Dict, Any, Optional
+import threading
+import queue
+import functools
+from time import monotonic
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable
 from contextlib import closing
 from datetime import datetime
 from dotenv import load_dotenv
 import streamlit as st
-from openai import OpenAI  # same client you used previously
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from openai.types.chat import ChatCompletionMessage
+from pydantic import BaseModel, Field, ValidationError
+try:
+    # optional: faster (de)serialization of tool arguments and results
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    orjson = None
+    ORJSON_AVAILABLE = False
+try:
+    # optional: the OpenAI HTTP client only speaks HTTP/2 when the h2 package is installed
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:
+    HTTP2_AVAILABLE = False
 
 # load env
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DB_PATH = "reservation_agent.db"
 
-from datetime import datetime, timezone
+from datetime import datetime
 try:
     # Python 3.9+: accurate zone support
     from zoneinfo import ZoneInfo
@@ -26,125 +46,289 @@ except Exception:
 
 # Default timezone to use for comparisons (user timezone per your info)
 DEFAULT_TZ_NAME = "Asia/Kolkata"
+# Streamlit re-executes this script on every interaction; st.cache_resource keeps
+# one-time setup (tz, DB bootstrap, restaurants cache) alive across those reruns.
+@st.cache_resource
+def _default_tz():
+    return ZoneInfo(DEFAULT_TZ_NAME) if ZONE_INFO_AVAILABLE else None
 
-import re
-from datetime import time, timedelta
+# resolved once per process; None when zoneinfo is unavailable
+_DEFAULT_TZ = _default_tz()
 
-# helper: simple time parser for strings like "7pm", "7:30 pm", "19:00"
-_time_re = re.compile(r"^\s*(?P<h>\d{1,2})(?::(?P<m>\d{2}))?\s*(?P<ampm>am|pm)?\s*$", re.IGNORECASE)
+@st.cache_resource(show_spinner=False)
+def _memo_store(name: str):
+    """Process-wide (OrderedDict, Lock) backing one _memoized() function."""
+    return OrderedDict(), threading.Lock()
 
-def _normalize_natural_datetime(dt_str: str):
+def _memoized(name: str, maxsize: int):
     """
-    Try to convert informal datetime strings into ISO "YYYY-MM-DD HH:MM" in DEFAULT_TZ_NAME.
-    Handles:
-      - 'YYYY-MM-DD HH:MM' or 'YYYY-MM-DDTHH:MM' -> passes through
-      - 'today 7pm', 'tonight 7 pm', 'tomorrow 19:00', 'tomorrow 7pm'
-      - '7pm' or '19:00' -> assume today unless that time already passed, then assume tomorrow
-    Returns (normalized_iso_str, debug_dict) or (None, debug_dict) on failure.
-    debug_dict contains 'now_iso' and reason/messages.
+    LRU memo decorator for pure helpers, like functools.lru_cache but kept in _memo_store(name):
+    functions defined in this script are rebuilt on every rerun, so an lru_cache would start
+    empty each time while this store survives reruns and is shared across sessions.
+    A hit costs about half a microsecond, so only use it for helpers that are slower than that.
     """
-    now = _now_in_default_tz()
-    debug = {"now_iso": now.isoformat(), "input": dt_str}
+    def decorate(fn):
+        memo, lock = _memo_store(name)
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            with lock:
+                if args in memo:
+                    memo.move_to_end(args)
+                    return memo[args]
+            result = fn(*args)
+            with lock:
+                memo[args] = result
+                if len(memo) > maxsize:
+                    memo.popitem(last=False)
+            return result
+        return wrapper
+    return decorate
+
+# ZONE_INFO_AVAILABLE never changes after import, so pick the tz handling once here
+# instead of testing it on every parse/render
+if ZONE_INFO_AVAILABLE:
+    def _to_default_tz(dt: datetime) -> datetime:
+        """Attach DEFAULT_TZ_NAME to a naive datetime, or convert an aware one to it."""
+        return dt.replace(tzinfo=_DEFAULT_TZ) if dt.tzinfo is None else dt.astimezone(_DEFAULT_TZ)
+
+    _format_dt = datetime.isoformat
+else:
+    def _to_default_tz(dt: datetime) -> datetime:
+        # no zone support: compare naively in server-local time, like _now_in_default_tz()
+        return dt if dt.tzinfo is None else dt.astimezone().replace(tzinfo=None)
+
+    def _format_dt(dt: datetime) -> str:
+        return dt.strftime("%Y-%m-%d %H:%M")
 
-    if not dt_str or not isinstance(dt_str, str):
-        debug["error"] = "empty_input"
-        return None, debug
+import re
+from datetime import time, timedelta
 
-    s = dt_str.strip().lower()
+# helper: simple time parser for strings like "7pm", "7:30 pm", "19:00"
+# (bytes pattern: inputs are lowercased ASCII, which skips str-pattern Unicode lookups)
+_time_re = re.compile(rb"^\s*(?P<h>\d{1,2})(?::(?P<m>\d{2}))?\s*(?P<ampm>am|pm)?\s*$")
 
-    # 1) Already ISO-ish?
-    try:
-        # allow both T and space
-        cand = s if "t" in s else s.replace(" ", "t")
-        dt = datetime.fromisoformat(cand)
-        # attach tz if missing
-        if ZONE_INFO_AVAILABLE:
-            tz = ZoneInfo(DEFAULT_TZ_NAME)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=tz)
-            else:
-                dt = dt.astimezone(tz)
-        debug["parsed_as"] = "iso"
-        debug["requested_iso"] = dt.isoformat()
-        return dt.strftime("%Y-%m-%d %H:%M"), debug
-    except Exception:
-        pass
+# word separators used by the fallback search for a time token ("... at 7pm", "... for 4 on ...")
+_SPLIT_RE = re.compile(r"\bat\b|\bfor\b|\bon\b")
 
-    # 2) Handle "today", "tonight", "tomorrow" prefixes
-    tokens = s.split()
-    day_offset = 0
-    if tokens[0] in ("today", "tonight"):
-        day_offset = 0
-        rest = " ".join(tokens[1:]).strip()
-    elif tokens[0] == "tomorrow":
-        day_offset = 1
-        rest = " ".join(tokens[1:]).strip()
+# prefixes recognised in front of a time, with the day offset they imply
+_DAY_PREFIXES = (("tomorrow", 1), ("tonight", 0), ("today", 0))
+_DAY_PREFIX_WORDS = tuple(prefix for prefix, _ in _DAY_PREFIXES)
+# literal separators scanned for before falling back to the regex split
+_TIME_SEPARATORS = (" at ", " on ", " for ")
+
+def _parse_time_fast(s: str, start: int = 0):
+    """
+    Hand-written equivalent of _time_re for ASCII input: scans s[start:] for
+    H, HH, H:MM or HH:MM followed by an optional 'am'/'pm' (s must already be lowercased).
+    Surrounding whitespace is skipped.
+    Returns (hour, minute, ampm_or_None, end_index) or None if no time is found at start.
+    """
+    n = len(s)
+    i = start
+    while i < n and s[i].isspace():
+        i += 1
+    if i >= n or not ("0" <= s[i] <= "9"):
+        return None
+    h = ord(s[i]) - 48
+    i += 1
+    if i < n and "0" <= s[i] <= "9":
+        h = h * 10 + ord(s[i]) - 48
+        i += 1
+    minute = 0
+    if i + 2 < n and s[i] == ":" and "0" <= s[i + 1] <= "9" and "0" <= s[i + 2] <= "9":
+        minute = (ord(s[i + 1]) - 48) * 10 + ord(s[i + 2]) - 48
+        i += 3
+    while i < n and s[i].isspace():
+        i += 1
+    ampm = None
+    if i + 1 < n and s[i + 1] == "m" and (s[i] == "a" or s[i] == "p"):
+        ampm = "am" if s[i] == "a" else "pm"
+        i += 2
+        while i < n and s[i].isspace():
+            i += 1
+    return h, minute, ampm, i
+
+def _to_24h(h: int, ampm: Optional[str]) -> int:
+    if ampm == "pm" and h < 12:
+        return h + 12
+    if ampm == "am" and h == 12:
+        return 0
+    return h
+
+# shape fingerprint bits for _shape_fingerprint()/_SHAPE_PARSERS
+_FP_TODAY = 0x01
+_FP_TOMORROW = 0x02
+_FP_COLON = 0x04
+_FP_PM = 0x08
+_FP_AM = 0x10
+_FP_TONIGHT = 0x20
+_FP_PREFIXES = (("tomorrow", _FP_TOMORROW), ("tonight", _FP_TONIGHT), ("today", _FP_TODAY))
+
+# deliberately not memoized: this is a sub-microsecond pure function, and a memo that survives
+# Streamlit reruns (lock + OrderedDict, see _memoized) costs more per hit than recomputing it
+def _shape_fingerprint(s: str) -> int:
+    """Cheap summary of a lowercased input: day prefix word, ':' present, trailing am/pm."""
+    fp = 0
+    for prefix, bit in _FP_PREFIXES:
+        if s.startswith(prefix) and (len(s) == len(prefix) or s[len(prefix)].isspace()):
+            fp |= bit
+            break
+    if ":" in s:
+        fp |= _FP_COLON
+    if s.endswith("pm"):
+        fp |= _FP_PM
+    elif s.endswith("am"):
+        fp |= _FP_AM
+    return fp
+
+def _build_shape_parser(fp: int):
+    """
+    Specialize a parser for one fingerprint: "[prefix ]H[:MM][ ]am|pm" with the prefix
+    length, ':MM' part and am/pm suffix fixed up front.
+    The returned function gives (hour_24, minute, day_offset) or None if s is not exactly that shape.
+    """
+    if fp & _FP_TOMORROW:
+        skip, day_offset = len("tomorrow"), 1
+    elif fp & _FP_TONIGHT:
+        skip, day_offset = len("tonight"), 0
+    elif fp & _FP_TODAY:
+        skip, day_offset = len("today"), 0
     else:
-        rest = s  # may be just "7pm" or "7:00 pm" or "19:00"
+        skip, day_offset = 0, 0
+    has_colon = bool(fp & _FP_COLON)
+    ampm = "pm" if fp & _FP_PM else ("am" if fp & _FP_AM else None)
+    suffix_len = 2 if ampm else 0
+
+    def parse(s: str):
+        i = skip
+        end = len(s) - suffix_len
+        while i < end and s[i].isspace():
+            i += 1
+        if i >= end or not ("0" <= s[i] <= "9"):
+            return None
+        h = ord(s[i]) - 48
+        i += 1
+        if i < end and "0" <= s[i] <= "9":
+            h = h * 10 + ord(s[i]) - 48
+            i += 1
+        minute = 0
+        if has_colon:
+            if i + 3 > end or s[i] != ":" or not ("0" <= s[i + 1] <= "9" and "0" <= s[i + 2] <= "9"):
+                return None
+            minute = (ord(s[i + 1]) - 48) * 10 + ord(s[i + 2]) - 48
+            i += 3
+        while i < end and s[i].isspace():
+            i += 1
+        if i != end:
+            return None
+        return _to_24h(h, ampm), minute, day_offset
+
+    return parse
+
+# one specialized parser per reachable fingerprint (at most one prefix bit, one of am/pm)
+_SHAPE_PARSERS = {
+    prefix_bit | colon_bit | ampm_bit: _build_shape_parser(prefix_bit | colon_bit | ampm_bit)
+    for prefix_bit in (0, _FP_TODAY, _FP_TOMORROW, _FP_TONIGHT)
+    for colon_bit in (0, _FP_COLON)
+    for ampm_bit in (0, _FP_PM, _FP_AM)
+}
+
+def _combine_day_and_time(now: datetime, day_offset: int, h: int, minute: int, debug: Dict[str, Any]) -> datetime:
+    """
+    Build the requested datetime on now's date + day_offset.
+    A time on the current day (day_offset == 0) that has already passed is moved to tomorrow.
+    """
+    candidate_day = now + timedelta(days=day_offset)
+    # tzinfo=_DEFAULT_TZ is None (naive) without zoneinfo
+    dt_combined = datetime(candidate_day.year, candidate_day.month, candidate_day.day, h, minute, tzinfo=_DEFAULT_TZ)
+    if day_offset == 0 and dt_combined <= now:
+        dt_combined = dt_combined + timedelta(days=1)
+        debug["adjusted_to_tomorrow"] = True
+    return dt_combined
+
+@_memoized("norm", maxsize=512)
+def _norm_cached(s: str, now: datetime):
+    """
+    Parsing behind _normalize_natural_datetime() for a stripped, lowercased, non-empty s.
+    now is the current time truncated to the minute, so repeated inputs within a minute hit the cache.
+    Returns (normalized_iso_str_or_None, details); details must not be mutated by callers.
+    """
+    debug: Dict[str, Any] = {}
+
+    # 1) Already ISO-ish? (only attempted for a YYYY-MM-DD prefix, so chat phrases
+    # don't pay for a raised/caught ValueError)
+    if len(s) >= 10 and s[4] == "-" and s[7] == "-":
+        try:
+            # allow both T and space
+            cand = s if "t" in s else s.replace(" ", "t")
+            dt = _to_default_tz(datetime.fromisoformat(cand))
+            debug["parsed_as"] = "iso"
+            debug["requested_iso"] = dt.isoformat()
+            return dt.strftime("%Y-%m-%d %H:%M"), debug
+        except ValueError:
+            pass
+
+    # 2) Common "[today|tonight|tomorrow] H[:MM][am|pm]" shapes via the fingerprint dispatch
+    parsed = _SHAPE_PARSERS[_shape_fingerprint(s)](s)
+    if parsed:
+        h, minute, day_offset = parsed
+        dt_combined = _combine_day_and_time(now, day_offset, h, minute, debug)
+        debug["parsed_as"] = "time_only"
+        debug["requested_iso"] = dt_combined.isoformat()
+        return dt_combined.strftime("%Y-%m-%d %H:%M"), debug
 
-    # 3) If rest is empty but we had "tonight"/"today", default to 19:00
+    # 3) Handle "today", "tonight", "tomorrow" prefixes
+    day_offset = 0
+    rest = s  # may be just "7pm" or "7:00 pm" or "19:00"
+    if s.startswith(_DAY_PREFIX_WORDS):
+        for prefix, offset in _DAY_PREFIXES:
+            if s.startswith(prefix) and (len(s) == len(prefix) or s[len(prefix)].isspace()):
+                day_offset = offset
+                rest = s[len(prefix):].lstrip()
+                break
+
+    # 4) If rest is empty but we had "tonight"/"today", default to 19:00
     if rest == "":
         default_hour = 19
         dt_candidate = now + timedelta(days=day_offset)
-        dt_combined = datetime(dt_candidate.year, dt_candidate.month, dt_candidate.day, default_hour, 0)
-        if ZONE_INFO_AVAILABLE:
-            dt_combined = dt_combined.replace(tzinfo=ZoneInfo(DEFAULT_TZ_NAME))
+        dt_combined = datetime(dt_candidate.year, dt_candidate.month, dt_candidate.day, default_hour, 0, tzinfo=_DEFAULT_TZ)
         debug["parsed_as"] = "default_evening"
         debug["requested_iso"] = dt_combined.isoformat()
         return dt_combined.strftime("%Y-%m-%d %H:%M"), debug
 
-    # 4) Parse time-only forms:
-    m = _time_re.match(rest)
-    if m:
-        h = int(m.group("h"))
-        minute = int(m.group("m") or 0)
-        ampm = m.group("ampm")
-        if ampm:
-            ampm = ampm.lower()
-            if ampm == "pm" and h < 12:
-                h = h + 12
-            if ampm == "am" and h == 12:
-                h = 0
-        # if 24h format and hour==24 -> set to 0 next day (unlikely)
-        # compose date with day_offset
-        candidate_day = now + timedelta(days=day_offset)
-        dt_combined = datetime(candidate_day.year, candidate_day.month, candidate_day.day, h, minute)
-        if ZONE_INFO_AVAILABLE:
-            dt_combined = dt_combined.replace(tzinfo=ZoneInfo(DEFAULT_TZ_NAME))
-        # If this is time-only (no explicit day) AND dt already passed today, and day_offset==0 -> try tomorrow
-        if day_offset == 0 and dt_combined <= now:
-            dt_combined = dt_combined + timedelta(days=1)
-            debug["adjusted_to_tomorrow"] = True
-        debug["parsed_as"] = "time_only"
-        debug["requested_iso"] = dt_combined.isoformat()
-        return dt_combined.strftime("%Y-%m-%d %H:%M"), debug
+    # check if any explicit "tomorrow" or date present earlier
+    if "tomorrow" in s:
+        day_offset = 1
+
+    # 5) try to catch "at 7pm" or "book for 4 at 19:00": the time usually follows the
+    # last separator, so scan for the literal separators before trying the regex split
+    sep_end = -1
+    for sep in _TIME_SEPARATORS:
+        idx = s.rfind(sep)
+        if idx >= 0 and idx + len(sep) > sep_end:
+            sep_end = idx + len(sep)
+    if sep_end >= 0:
+        t = _parse_time_fast(s, sep_end)
+        if t and t[3] == len(s):
+            h, minute, ampm, _ = t
+            dt_combined = _combine_day_and_time(now, day_offset, _to_24h(h, ampm), minute, debug)
+            debug["parsed_as"] = "found_time_token"
+            debug["requested_iso"] = dt_combined.isoformat()
+            return dt_combined.strftime("%Y-%m-%d %H:%M"), debug
 
-    # 5) try to catch "at 7pm" or "on 2025-11-10 at 19:00"
-    # basic approach: find a time token in the string
-    parts = re.split(r"\bat\b|\bfor\b|\bon\b", s)
+    # fallback: find a time token anywhere between word separators
+    parts = _SPLIT_RE.split(s)
     for part in parts[::-1]:
         part = part.strip()
-        m = _time_re.match(part)
+        if not part.isascii():
+            continue
+        m = _time_re.match(part.encode("ascii"))
         if m:
-            # handle similar to above
             h = int(m.group("h"))
             minute = int(m.group("m") or 0)
             ampm = m.group("ampm")
-            if ampm:
-                if ampm.lower() == "pm" and h < 12:
-                    h += 12
-                if ampm.lower() == "am" and h == 12:
-                    h = 0
-            # check if any explicit "tomorrow" or date present earlier
-            if "tomorrow" in s:
-                day_offset = 1
-            candidate_day = now + timedelta(days=day_offset)
-            dt_combined = datetime(candidate_day.year, candidate_day.month, candidate_day.day, h, minute)
-            if ZONE_INFO_AVAILABLE:
-                dt_combined = dt_combined.replace(tzinfo=ZoneInfo(DEFAULT_TZ_NAME))
-            if day_offset == 0 and dt_combined <= now:
-                dt_combined = dt_combined + timedelta(days=1)
-                debug["adjusted_to_tomorrow"] = True
+            dt_combined = _combine_day_and_time(now, day_offset, _to_24h(h, ampm and ampm.decode()), minute, debug)
             debug["parsed_as"] = "found_time_token"
             debug["requested_iso"] = dt_combined.isoformat()
             return dt_combined.strftime("%Y-%m-%d %H:%M"), debug
@@ -153,6 +337,33 @@ def _normalize_natural_datetime(dt_str: str):
     debug["error"] = "unrecognized_format"
     return None, debug
 
+def _normalize_natural_datetime(dt_str: str):
+    """
+    Try to convert informal datetime strings into ISO "YYYY-MM-DD HH:MM" in DEFAULT_TZ_NAME.
+    Handles:
+      - 'YYYY-MM-DD HH:MM' or 'YYYY-MM-DDTHH:MM' -> passes through
+      - 'today 7pm', 'tonight 7 pm', 'tomorrow 19:00', 'tomorrow 7pm'
+      - '7pm' or '19:00' -> assume today unless that time already passed, then assume tomorrow
+    Returns (normalized_iso_str, debug_dict) or (None, debug_dict) on failure.
+    debug_dict contains 'now_iso' and reason/messages.
+    """
+    now = _now_in_default_tz()
+    debug = {"now_iso": now.isoformat(), "input": dt_str}
+
+    if not dt_str or not isinstance(dt_str, str):
+        debug["error"] = "empty_input"
+        return None, debug
+
+    s = dt_str.strip().lower()
+    if not s:
+        debug["error"] = "empty_input"
+        return None, debug
+
+    # the result only depends on the input and the current minute (parsed times have no seconds)
+    normalized, details = _norm_cached(s, now.replace(second=0, microsecond=0))
+    debug.update(details)
+    return normalized, debug
+
 # replace the old _parse_datetime_for_ui with this corrected version
 def _parse_datetime_for_ui(dt_str: str):
     """
@@ -178,16 +389,7 @@ def _parse_datetime_for_ui(dt_str: str):
         return None, "Invalid datetime format. Use YYYY-MM-DD HH:MM", True, now_iso, None
 
     # attach timezone (make aware)
-    if ZONE_INFO_AVAILABLE:
-        tz = ZoneInfo(DEFAULT_TZ_NAME)
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=tz)
-        else:
-            dt = dt.astimezone(tz)
-    else:
-        # fallback: if dt has tzinfo convert to naive local time (best-effort)
-        if dt.tzinfo is not None:
-            dt = dt.astimezone().replace(tzinfo=None)
+    dt = _to_default_tz(dt)
 
     requested_iso = dt.isoformat() if (dt is not None) else None
 
@@ -209,43 +411,41 @@ def _parse_datetime_with_tz(dt_str: str):
 
     # normalize separators
     s = dt_str.strip()
+    if len(s) < 10 or s[4] != "-" or s[7] != "-":
+        raise ValueError("invalid_datetime_format")
     if "T" not in s:
         s = s.replace(" ", "T")
 
     try:
         dt = datetime.fromisoformat(s)
-    except Exception:
+    except ValueError:
         raise ValueError("invalid_datetime_format")
 
     # attach timezone
-    if ZONE_INFO_AVAILABLE:
-        tz = ZoneInfo(DEFAULT_TZ_NAME)
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=tz)
-        else:
-            dt = dt.astimezone(tz)
-    else:
-        # fallback: remove tzinfo and compare naively
-        if dt.tzinfo is not None:
-            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
-    return dt
+    return _to_default_tz(dt)
+
+def _parse_dt_and_now(dt_str: str):
+    """
+    Parse dt_str like _parse_datetime_with_tz() and read the current time in the same step.
+    Returns (requested_dt, now). Raises ValueError if dt_str is invalid.
+    """
+    return _parse_datetime_with_tz(dt_str), _now_in_default_tz()
 
 def _now_in_default_tz():
-    if ZONE_INFO_AVAILABLE:
-        return datetime.now(ZoneInfo(DEFAULT_TZ_NAME))
-    else:
-        return datetime.now()
-
-if "clear_manual_after" in st.session_state and st.session_state["clear_manual_after"]:
-    # clear the manual booking fields BEFORE widgets are instantiated
-    st.session_state["manual_dt_iso"] = ""
-    st.session_state["manual_name"] = ""
-    st.session_state["manual_contact"] = ""
-    st.session_state["manual_seating"] = ""
-    st.session_state["manual_rest_select"] = "-- choose --"
-    st.session_state["manual_party_size"] = 2
-    # reset the flag
-    st.session_state["clear_manual_after"] = False
+    # datetime.now(None) is naive local time, the fallback without zoneinfo
+    return datetime.now(_DEFAULT_TZ)
+
+if st.session_state.get("clear_manual_after"):
+    # clear the manual booking fields BEFORE widgets are instantiated, and reset the flag
+    st.session_state.update({
+        "manual_dt_iso": "",
+        "manual_name": "",
+        "manual_contact": "",
+        "manual_seating": "",
+        "manual_rest_select": "-- choose --",
+        "manual_party_size": 2,
+        "clear_manual_after": False,
+    })
 
 # Ensure session state keys exist
 if "history" not in st.session_state:
@@ -253,45 +453,114 @@ if "history" not in st.session_state:
 if "chat_display" not in st.session_state:
     st.session_state.chat_display = []
 
-# Show any pending success/error from last action BEFORE widgets are rendered
-if st.session_state.get("last_success"):
-    st.success(st.session_state["last_success"])
-    # optional: also show JSON details if present
-    if st.session_state.get("last_success_payload"):
-        st.json(st.session_state["last_success_payload"])
-    # clear after showing
-    st.session_state["last_success"] = None
-    st.session_state["last_success_payload"] = None
-
-if st.session_state.get("last_error"):
-    st.error(st.session_state["last_error"])
-    if st.session_state.get("last_error_payload"):
-        st.json(st.session_state["last_error_payload"])
-    st.session_state["last_error"] = None
-    st.session_state["last_error_payload"] = None
-
-# Safe clear flag handling (clear manual inputs before widget creation)
-if st.session_state.get("clear_manual_after", False):
-    st.session_state["manual_dt_iso"] = ""
-    st.session_state["manual_name"] = ""
-    st.session_state["manual_contact"] = ""
-    st.session_state["manual_seating"] = ""
-    st.session_state["manual_rest_select"] = "-- choose --"
-    st.session_state["manual_party_size"] = 2
-    st.session_state["clear_manual_after"] = False
+def _set_status(kind: str, msg: str, payload: Any = None):
+    """Record the manual form's outcome in one session_state key; rendered once at the end of the form."""
+    st.session_state["manual_status"] = {"kind": kind, "msg": msg, "payload": payload}
+
+def _show_status(placeholder, kind: str, msg: str, payload: Any = None):
+    """Render a status message (kind: "success" or "error") plus optional JSON details into placeholder."""
+    with placeholder.container():
+        getattr(st, kind)(msg)
+        if payload:
+            st.json(payload)
 
 
 # -----------------------
 # DB init & data-layer (same as before, with corrected variable names)
 # -----------------------
+# Every statement the runtime helpers execute, kept as fixed text: sqlite3 caches prepared
+# statements per connection keyed by SQL text, so each one is parsed once and then reused.
+# (init_db's one-off DDL/seed statements stay inline.)
+_SQL = {
+    "restaurants_all": "SELECT id, name, cuisines_json, address, city, capacity_max, seating_types_json, opening_hour, closing_hour, avg_rating FROM restaurants",
+    "slot_capacity": """
+        SELECT r.capacity_max,
+               COALESCE((SELECT SUM(party_size) FROM reservations
+                         WHERE restaurant_id=r.id AND datetime_iso=? AND status='confirmed'), 0)
+        FROM restaurants r WHERE r.id=?
+    """,
+    "insert_if_capacity": """
+        INSERT INTO reservations
+        (reservation_code, restaurant_id, datetime_iso, party_size, user_name, contact, seating_type, status, created_at)
+        SELECT ?,?,?,?,?,?,?, 'confirmed', datetime('now')
+        FROM restaurants r
+        WHERE r.id=?
+          AND (SELECT COALESCE(SUM(party_size), 0) FROM reservations
+               WHERE restaurant_id=? AND datetime_iso=? AND status='confirmed') + ? <= r.capacity_max
+    """,
+    "insert_reservation": """
+        INSERT INTO reservations
+        (reservation_code, restaurant_id, datetime_iso, party_size, user_name, contact, seating_type, status, created_at)
+        VALUES (?,?,?,?,?,?,?, 'confirmed', datetime('now'))
+    """,
+    "reservation_status": "SELECT status, restaurant_id, datetime_iso FROM reservations WHERE reservation_code=?",
+    "cancel_reservation": "UPDATE reservations SET status='cancelled' WHERE reservation_code=?",
+    "reservations_by_contact": """
+        SELECT r.reservation_code, r.datetime_iso, r.party_size, r.user_name, r.status, rest.name
+        FROM reservations r JOIN restaurants rest ON r.restaurant_id = rest.id
+        WHERE r.contact = ?
+        ORDER BY r.datetime_iso DESC
+    """,
+}
+
+# one long-lived connection shared by the data-layer helpers; _DB_LOCK serializes access.
+# Streamlit re-executes this script in a fresh namespace on every rerun, so the lock must be
+# held by st.cache_resource like the connection it guards; a plain module-level Lock() would
+# be a different lock per rerun/session around the same connection.
+@st.cache_resource(show_spinner=False)
+def _db_lock() -> threading.Lock:
+    return threading.Lock()
+
+_DB_LOCK = _db_lock()
+
+# show_spinner=False (here, on the restaurants caches and on _async_client): these are also
+# reached from the LLM loop and tool worker threads, where a cache-miss spinner has no
+# session to render into and raises NoSessionContext
+@st.cache_resource(show_spinner=False)
+def _get_conn() -> sqlite3.Connection:
+    """
+    Return the shared connection, opened once per server process (held by st.cache_resource).
+    Use it with _DB_LOCK held. The connection runs in autocommit mode
+    (isolation_level=None), so multi-statement writes issue their own BEGIN/COMMIT.
+    """
+    con = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA foreign_keys=ON")
+    con.execute("PRAGMA cache_size=-20000")
+    con.row_factory = sqlite3.Row
+    return con
+
+def _resolve_conn(conn: Optional[sqlite3.Connection]) -> sqlite3.Connection:
+    """
+    The connection a data-layer helper should use: conn if given, else _get_conn().
+    A caller-supplied conn must be in autocommit mode (isolation_level=None), like the shared one:
+    the helpers issue their own BEGIN/COMMIT, and with sqlite3's default implicit transactions
+    a write would report success but stay uncommitted.
+    """
+    if conn is None:
+        return _get_conn()
+    if conn.isolation_level is not None:
+        raise ValueError("conn must be opened with isolation_level=None (autocommit)")
+    return conn
+
+# stored in PRAGMA user_version by init_db(); bump it when the schema/migrations below change
+_SCHEMA_VERSION = 1
+
 def init_db(db_path: str = DB_PATH):
+    # sentinel: a non-empty DB file already initialised at the current schema version
+    # needs none of the DDL, migration or seed work below
+    if os.path.exists(db_path) and os.path.getsize(db_path) > 4096:
+        with closing(sqlite3.connect(db_path)) as con:
+            if con.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+                return
     with closing(sqlite3.connect(db_path)) as con:
         cur = con.cursor()
         cur.execute("PRAGMA foreign_keys = ON;")
         cur.execute("""
         CREATE TABLE IF NOT EXISTS restaurants (
             id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
+            name TEXT NOT NULL UNIQUE,
             cuisines_json TEXT NOT NULL,
             address TEXT,
             city TEXT,
@@ -317,80 +586,143 @@ def init_db(db_path: str = DB_PATH):
             FOREIGN KEY (restaurant_id) REFERENCES restaurants(id)
         )
         """)
+        # covers the per-slot SUM(party_size) lookups done by availability checks and bookings
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_res_slot ON reservations(restaurant_id, datetime_iso, status)")
         con.commit()
         cur.execute("SELECT COUNT(*) FROM restaurants")
         if cur.fetchone()[0] == 0:
             restaurants_seed = [
                 # Delhi (10)
-                ("Sakura Sky Lounge", json.dumps(["Japanese", "Sushi"]), "HSR Layout, Delhi", "Delhi", 50, json.dumps(["rooftop", "outdoor"]), "18:00", "23:30", 4.6),
-                ("Trattoria Roma", json.dumps(["Italian", "Pasta"]), "Connaught Place, Delhi", "Delhi", 60, json.dumps(["indoor", "outdoor"]), "11:00", "23:00", 4.4),
-                ("Skyline Rooftop", json.dumps(["Modern Indian", "Fusion", "Sushi"]), "HSR Layout, Delhi", "Delhi", 120, json.dumps(["rooftop", "private"]), "17:00", "01:00", 4.7),
-                ("Jazz & Dine", json.dumps(["American", "Barbecue"]), "Hauz Khas, Delhi", "Delhi", 80, json.dumps(["indoor", "live-music"]), "12:00", "23:00", 4.1),
-                ("La Petite", json.dumps(["French", "Bakery"]), "GK-II, Delhi", "Delhi", 25, json.dumps(["indoor", "patio"]), "08:00", "21:00", 4.8),
-                ("Curry Leaf", json.dumps(["North Indian", "Mughlai"]), "Rajouri Garden, Delhi", "Delhi", 100, json.dumps(["family", "indoor"]), "11:00", "23:00", 4.3),
-                ("Bao Bar", json.dumps(["Asian", "Chinese", "Dimsum"]), "Khan Market, Delhi", "Delhi", 55, json.dumps(["indoor", "casual"]), "12:00", "23:00", 4.5),
-                ("The Terrace Grill", json.dumps(["Continental", "Steakhouse"]), "CP, Delhi", "Delhi", 90, json.dumps(["rooftop", "bar"]), "17:00", "00:00", 4.6),
-                ("Tandoor Tales", json.dumps(["Punjabi", "Tandoori"]), "Karol Bagh, Delhi", "Delhi", 85, json.dumps(["indoor", "family"]), "11:00", "23:00", 4.2),
-                ("Masala Republic", json.dumps(["Indian", "Fusion"]), "Saket, Delhi", "Delhi", 70, json.dumps(["fine-dine", "modern"]), "12:00", "23:30", 4.5),
+                ("Sakura Sky Lounge", ["Japanese", "Sushi"], "HSR Layout, Delhi", "Delhi", 50, ["rooftop", "outdoor"], "18:00", "23:30", 4.6),
+                ("Trattoria Roma", ["Italian", "Pasta"], "Connaught Place, Delhi", "Delhi", 60, ["indoor", "outdoor"], "11:00", "23:00", 4.4),
+                ("Skyline Rooftop", ["Modern Indian", "Fusion", "Sushi"], "HSR Layout, Delhi", "Delhi", 120, ["rooftop", "private"], "17:00", "01:00", 4.7),
+                ("Jazz & Dine", ["American", "Barbecue"], "Hauz Khas, Delhi", "Delhi", 80, ["indoor", "live-music"], "12:00", "23:00", 4.1),
+                ("La Petite", ["French", "Bakery"], "GK-II, Delhi", "Delhi", 25, ["indoor", "patio"], "08:00", "21:00", 4.8),
+                ("Curry Leaf", ["North Indian", "Mughlai"], "Rajouri Garden, Delhi", "Delhi", 100, ["family", "indoor"], "11:00", "23:00", 4.3),
+                ("Bao Bar", ["Asian", "Chinese", "Dimsum"], "Khan Market, Delhi", "Delhi", 55, ["indoor", "casual"], "12:00", "23:00", 4.5),
+                ("The Terrace Grill", ["Continental", "Steakhouse"], "CP, Delhi", "Delhi", 90, ["rooftop", "bar"], "17:00", "00:00", 4.6),
+                ("Tandoor Tales", ["Punjabi", "Tandoori"], "Karol Bagh, Delhi", "Delhi", 85, ["indoor", "family"], "11:00", "23:00", 4.2),
+                ("Masala Republic", ["Indian", "Fusion"], "Saket, Delhi", "Delhi", 70, ["fine-dine", "modern"], "12:00", "23:30", 4.5),
 
                 # Mumbai (10)
-                ("The Bombay Brasserie", json.dumps(["Indian", "Seafood"]), "Bandra, Mumbai", "Mumbai", 95, json.dumps(["indoor", "bar"]), "12:00", "00:00", 4.6),
-                ("Pasta Street", json.dumps(["Italian"]), "Lower Parel, Mumbai", "Mumbai", 50, json.dumps(["indoor", "family"]), "11:00", "23:00", 4.3),
-                ("Oceanside Diner", json.dumps(["Seafood", "Continental"]), "Juhu Beach, Mumbai", "Mumbai", 120, json.dumps(["seaside", "outdoor"]), "18:00", "01:00", 4.7),
-                ("Saffron Soul", json.dumps(["Indian", "Biryani"]), "Andheri, Mumbai", "Mumbai", 75, json.dumps(["buffet", "indoor"]), "12:00", "23:30", 4.4),
-                ("Cafe de Arts", json.dumps(["Cafe", "Bakery"]), "Colaba, Mumbai", "Mumbai", 40, json.dumps(["art-cafe", "casual"]), "08:00", "21:00", 4.5),
-                ("Zen Izakaya", json.dumps(["Japanese", "Sushi"]), "BKC, Mumbai", "Mumbai", 60, json.dumps(["rooftop", "sushi-bar"]), "18:00", "00:00", 4.7),
-                ("Tap & Barrel", json.dumps(["Pub", "Finger Food"]), "Powai, Mumbai", "Mumbai", 110, json.dumps(["pub", "sports"]), "17:00", "01:00", 4.3),
-                ("Le Ciel", json.dumps(["French", "Continental"]), "Nariman Point, Mumbai", "Mumbai", 90, json.dumps(["fine-dine", "romantic"]), "19:00", "23:30", 4.8),
-                ("Kebab Kingdom", json.dumps(["North Indian", "Grill"]), "Kurla, Mumbai", "Mumbai", 80, json.dumps(["casual", "family"]), "11:00", "23:00", 4.2),
-                ("Green Bowl", json.dumps(["Vegan", "Healthy"]), "Bandra, Mumbai", "Mumbai", 45, json.dumps(["indoor", "garden"]), "09:00", "22:00", 4.5),
+                ("The Bombay Brasserie", ["Indian", "Seafood"], "Bandra, Mumbai", "Mumbai", 95, ["indoor", "bar"], "12:00", "00:00", 4.6),
+                ("Pasta Street", ["Italian"], "Lower Parel, Mumbai", "Mumbai", 50, ["indoor", "family"], "11:00", "23:00", 4.3),
+                ("Oceanside Diner", ["Seafood", "Continental"], "Juhu Beach, Mumbai", "Mumbai", 120, ["seaside", "outdoor"], "18:00", "01:00", 4.7),
+                ("Saffron Soul", ["Indian", "Biryani"], "Andheri, Mumbai", "Mumbai", 75, ["buffet", "indoor"], "12:00", "23:30", 4.4),
+                ("Cafe de Arts", ["Cafe", "Bakery"], "Colaba, Mumbai", "Mumbai", 40, ["art-cafe", "casual"], "08:00", "21:00", 4.5),
+                ("Zen Izakaya", ["Japanese", "Sushi"], "BKC, Mumbai", "Mumbai", 60, ["rooftop", "sushi-bar"], "18:00", "00:00", 4.7),
+                ("Tap & Barrel", ["Pub", "Finger Food"], "Powai, Mumbai", "Mumbai", 110, ["pub", "sports"], "17:00", "01:00", 4.3),
+                ("Le Ciel", ["French", "Continental"], "Nariman Point, Mumbai", "Mumbai", 90, ["fine-dine", "romantic"], "19:00", "23:30", 4.8),
+                ("Kebab Kingdom", ["North Indian", "Grill"], "Kurla, Mumbai", "Mumbai", 80, ["casual", "family"], "11:00", "23:00", 4.2),
+                ("Green Bowl", ["Vegan", "Healthy"], "Bandra, Mumbai", "Mumbai", 45, ["indoor", "garden"], "09:00", "22:00", 4.5),
 
                 # Bengaluru (10)
-                ("Cloud 9 Terrace", json.dumps(["Continental", "Fusion"]), "Indiranagar, Bengaluru", "Bengaluru", 100, json.dumps(["rooftop", "bar"]), "18:00", "00:00", 4.6),
-                ("Rasa Rasoi", json.dumps(["South Indian", "Traditional"]), "Jayanagar, Bengaluru", "Bengaluru", 60, json.dumps(["indoor", "family"]), "07:30", "22:30", 4.4),
-                ("Grill House 88", json.dumps(["BBQ", "Steakhouse"]), "Koramangala, Bengaluru", "Bengaluru", 85, json.dumps(["outdoor", "barbecue"]), "12:00", "23:00", 4.5),
-                ("Tapri Tales", json.dumps(["Cafe", "Tea"]), "Whitefield, Bengaluru", "Bengaluru", 40, json.dumps(["indoor", "casual"]), "08:00", "21:00", 4.3),
-                ("The Wok Lab", json.dumps(["Asian", "Thai"]), "HSR Layout, Bengaluru", "Bengaluru", 70, json.dumps(["indoor", "family"]), "11:00", "23:00", 4.4),
-                ("Elora Lounge", json.dumps(["Mediterranean", "Tapas"]), "Indiranagar, Bengaluru", "Bengaluru", 120, json.dumps(["rooftop", "live-music"]), "17:00", "01:00", 4.7),
-                ("Cafe Nilgiri", json.dumps(["Coffee", "Desserts"]), "MG Road, Bengaluru", "Bengaluru", 30, json.dumps(["cafe", "quiet"]), "09:00", "22:00", 4.6),
-                ("Korma Kafe", json.dumps(["Indian", "Mughlai"]), "BTM Layout, Bengaluru", "Bengaluru", 75, json.dumps(["indoor", "buffet"]), "12:00", "23:00", 4.3),
-                ("Urban Spice", json.dumps(["Continental", "Fusion"]), "JP Nagar, Bengaluru", "Bengaluru", 90, json.dumps(["fine-dine", "family"]), "12:00", "23:30", 4.5),
-                ("The Sizzler Pit", json.dumps(["Sizzlers", "Grill"]), "Koramangala, Bengaluru", "Bengaluru", 70, json.dumps(["casual", "indoor"]), "11:00", "23:00", 4.2),
+                ("Cloud 9 Terrace", ["Continental", "Fusion"], "Indiranagar, Bengaluru", "Bengaluru", 100, ["rooftop", "bar"], "18:00", "00:00", 4.6),
+                ("Rasa Rasoi", ["South Indian", "Traditional"], "Jayanagar, Bengaluru", "Bengaluru", 60, ["indoor", "family"], "07:30", "22:30", 4.4),
+                ("Grill House 88", ["BBQ", "Steakhouse"], "Koramangala, Bengaluru", "Bengaluru", 85, ["outdoor", "barbecue"], "12:00", "23:00", 4.5),
+                ("Tapri Tales", ["Cafe", "Tea"], "Whitefield, Bengaluru", "Bengaluru", 40, ["indoor", "casual"], "08:00", "21:00", 4.3),
+                ("The Wok Lab", ["Asian", "Thai"], "HSR Layout, Bengaluru", "Bengaluru", 70, ["indoor", "family"], "11:00", "23:00", 4.4),
+                ("Elora Lounge", ["Mediterranean", "Tapas"], "Indiranagar, Bengaluru", "Bengaluru", 120, ["rooftop", "live-music"], "17:00", "01:00", 4.7),
+                ("Cafe Nilgiri", ["Coffee", "Desserts"], "MG Road, Bengaluru", "Bengaluru", 30, ["cafe", "quiet"], "09:00", "22:00", 4.6),
+                ("Korma Kafe", ["Indian", "Mughlai"], "BTM Layout, Bengaluru", "Bengaluru", 75, ["indoor", "buffet"], "12:00", "23:00", 4.3),
+                ("Urban Spice", ["Continental", "Fusion"], "JP Nagar, Bengaluru", "Bengaluru", 90, ["fine-dine", "family"], "12:00", "23:30", 4.5),
+                ("The Sizzler Pit", ["Sizzlers", "Grill"], "Koramangala, Bengaluru", "Bengaluru", 70, ["casual", "indoor"], "11:00", "23:00", 4.2),
 
                 # Pune (5)
-                ("Little Italy", json.dumps(["Italian", "Pizza"]), "Koregaon Park, Pune", "Pune", 50, json.dumps(["indoor", "family"]), "11:00", "23:00", 4.5),
-                ("BBQ Ville", json.dumps(["BBQ", "Grill"]), "Viman Nagar, Pune", "Pune", 100, json.dumps(["outdoor", "barbecue"]), "12:00", "23:30", 4.4),
-                ("The French Door", json.dumps(["French", "European"]), "Baner, Pune", "Pune", 60, json.dumps(["patio", "romantic"]), "18:00", "23:00", 4.6),
-                ("Poha Junction", json.dumps(["Maharashtrian", "Breakfast"]), "Kothrud, Pune", "Pune", 35, json.dumps(["casual", "cafe"]), "07:00", "12:00", 4.3),
-                ("The Spice Den", json.dumps(["Indian", "Chinese"]), "Hinjewadi, Pune", "Pune", 90, json.dumps(["indoor", "family"]), "11:00", "23:00", 4.2),
+                ("Little Italy", ["Italian", "Pizza"], "Koregaon Park, Pune", "Pune", 50, ["indoor", "family"], "11:00", "23:00", 4.5),
+                ("BBQ Ville", ["BBQ", "Grill"], "Viman Nagar, Pune", "Pune", 100, ["outdoor", "barbecue"], "12:00", "23:30", 4.4),
+                ("The French Door", ["French", "European"], "Baner, Pune", "Pune", 60, ["patio", "romantic"], "18:00", "23:00", 4.6),
+                ("Poha Junction", ["Maharashtrian", "Breakfast"], "Kothrud, Pune", "Pune", 35, ["casual", "cafe"], "07:00", "12:00", 4.3),
+                ("The Spice Den", ["Indian", "Chinese"], "Hinjewadi, Pune", "Pune", 90, ["indoor", "family"], "11:00", "23:00", 4.2),
 
                 # Hyderabad (5)
-                ("Biryani Mahal", json.dumps(["Hyderabadi", "Biryani"]), "Banjara Hills, Hyderabad", "Hyderabad", 120, json.dumps(["indoor", "family"]), "11:00", "23:30", 4.7),
-                ("Noodle Republic", json.dumps(["Asian", "Chinese"]), "Hitech City, Hyderabad", "Hyderabad", 75, json.dumps(["indoor", "casual"]), "12:00", "23:00", 4.3),
-                ("Kebab-e-Khaas", json.dumps(["North Indian", "Grill"]), "Secunderabad, Hyderabad", "Hyderabad", 90, json.dumps(["indoor", "barbecue"]), "11:00", "23:30", 4.5),
-                ("Sky High Bistro", json.dumps(["Continental", "Bar"]), "Gachibowli, Hyderabad", "Hyderabad", 150, json.dumps(["rooftop", "live-music"]), "18:00", "01:00", 4.8),
-                ("The Sweet Spot", json.dumps(["Desserts", "Bakery"]), "Jubilee Hills, Hyderabad", "Hyderabad", 40, json.dumps(["cafe", "casual"]), "09:00", "21:00", 4.6),
+                ("Biryani Mahal", ["Hyderabadi", "Biryani"], "Banjara Hills, Hyderabad", "Hyderabad", 120, ["indoor", "family"], "11:00", "23:30", 4.7),
+                ("Noodle Republic", ["Asian", "Chinese"], "Hitech City, Hyderabad", "Hyderabad", 75, ["indoor", "casual"], "12:00", "23:00", 4.3),
+                ("Kebab-e-Khaas", ["North Indian", "Grill"], "Secunderabad, Hyderabad", "Hyderabad", 90, ["indoor", "barbecue"], "11:00", "23:30", 4.5),
+                ("Sky High Bistro", ["Continental", "Bar"], "Gachibowli, Hyderabad", "Hyderabad", 150, ["rooftop", "live-music"], "18:00", "01:00", 4.8),
+                ("The Sweet Spot", ["Desserts", "Bakery"], "Jubilee Hills, Hyderabad", "Hyderabad", 40, ["cafe", "casual"], "09:00", "21:00", 4.6),
 
                 # Chennai (5)
-                ("Marina Bay Diner", json.dumps(["Seafood", "South Indian"]), "Besant Nagar, Chennai", "Chennai", 100, json.dumps(["seaside", "outdoor"]), "12:00", "23:30", 4.6),
-                ("Idli Express", json.dumps(["South Indian", "Fast Food"]), "T Nagar, Chennai", "Chennai", 30, json.dumps(["casual", "takeaway"]), "06:30", "22:00", 4.2),
-                ("Bella Napoli", json.dumps(["Italian", "Pizza"]), "Nungambakkam, Chennai", "Chennai", 65, json.dumps(["indoor", "family"]), "12:00", "23:00", 4.5),
-                ("Spice Route", json.dumps(["Indian", "Thai"]), "Velachery, Chennai", "Chennai", 85, json.dumps(["fine-dine", "romantic"]), "12:00", "23:00", 4.4),
-                ("The Choco Room", json.dumps(["Cafe", "Desserts"]), "Anna Nagar, Chennai", "Chennai", 40, json.dumps(["cafe", "casual"]), "10:00", "22:00", 4.3),
+                ("Marina Bay Diner", ["Seafood", "South Indian"], "Besant Nagar, Chennai", "Chennai", 100, ["seaside", "outdoor"], "12:00", "23:30", 4.6),
+                ("Idli Express", ["South Indian", "Fast Food"], "T Nagar, Chennai", "Chennai", 30, ["casual", "takeaway"], "06:30", "22:00", 4.2),
+                ("Bella Napoli", ["Italian", "Pizza"], "Nungambakkam, Chennai", "Chennai", 65, ["indoor", "family"], "12:00", "23:00", 4.5),
+                ("Spice Route", ["Indian", "Thai"], "Velachery, Chennai", "Chennai", 85, ["fine-dine", "romantic"], "12:00", "23:00", 4.4),
+                ("The Choco Room", ["Cafe", "Desserts"], "Anna Nagar, Chennai", "Chennai", 40, ["cafe", "casual"], "10:00", "22:00", 4.3),
 
                 # +5 Extra entries to reach 50 (varied cities)
-                ("Rooftop Mirage", json.dumps(["Sushi", "Japanese"]), "HSR Layout, Bengaluru", "Bengaluru", 45, json.dumps(["rooftop", "romantic"]), "18:00", "23:30", 4.6),
-                ("Monsoon Grill", json.dumps(["Seafood", "Grill"]), "Bandra, Mumbai", "Mumbai", 85, json.dumps(["outdoor", "seaside"]), "17:00", "00:30", 4.4),
-                ("Heritage Bites", json.dumps(["Indian", "Street Food"]), "Old Delhi, Delhi", "Delhi", 60, json.dumps(["casual", "outdoor"]), "10:00", "23:00", 4.2),
-                ("Vine & Dine", json.dumps(["Mediterranean", "Wine Bar"]), "Koramangala, Bengaluru", "Bengaluru", 55, json.dumps(["indoor", "wine-bar"]), "18:00", "23:30", 4.7),
-                ("Sunset Cafe", json.dumps(["Cafe", "Light Bites"]), "Juhu, Mumbai", "Mumbai", 35, json.dumps(["seaside", "patio"]), "07:00", "21:00", 4.4),
+                ("Rooftop Mirage", ["Sushi", "Japanese"], "HSR Layout, Bengaluru", "Bengaluru", 45, ["rooftop", "romantic"], "18:00", "23:30", 4.6),
+                ("Monsoon Grill", ["Seafood", "Grill"], "Bandra, Mumbai", "Mumbai", 85, ["outdoor", "seaside"], "17:00", "00:30", 4.4),
+                ("Heritage Bites", ["Indian", "Street Food"], "Old Delhi, Delhi", "Delhi", 60, ["casual", "outdoor"], "10:00", "23:00", 4.2),
+                ("Vine & Dine", ["Mediterranean", "Wine Bar"], "Koramangala, Bengaluru", "Bengaluru", 55, ["indoor", "wine-bar"], "18:00", "23:30", 4.7),
+                ("Sunset Cafe", ["Cafe", "Light Bites"], "Juhu, Mumbai", "Mumbai", 35, ["seaside", "patio"], "07:00", "21:00", 4.4),
             ]
 
+            # bootstrap only: skip fsyncs while seeding and insert everything in one transaction;
+            # OR IGNORE (keyed on the unique name) keeps a concurrent/repeated seed harmless
+            cur.execute("PRAGMA synchronous=OFF")
+            cur.execute("BEGIN")
             cur.executemany("""
-                INSERT INTO restaurants (name, cuisines_json, address, city, capacity_max, seating_types_json, opening_hour, closing_hour, avg_rating)
+                INSERT OR IGNORE INTO restaurants (name, cuisines_json, address, city, capacity_max, seating_types_json, opening_hour, closing_hour, avg_rating)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, restaurants_seed)
+            """, [
+                (name, json.dumps(cuisines), address, city, capacity_max, json.dumps(seating), opening_hour, closing_hour, rating)
+                for name, cuisines, address, city, capacity_max, seating, opening_hour, closing_hour, rating in restaurants_seed
+            ])
             con.commit()
+            cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+    # seeds (or an existing table) may differ from what was cached; reload on next search
+    _load_restaurants_cache.clear()
+    _all_restaurants_sorted.clear()
+    _restaurant_choices.clear()
+
+@st.cache_resource
+def _init_once() -> bool:
+    """Run init_db() once per server process instead of on every Streamlit rerun."""
+    init_db(DB_PATH)
+    return True
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _load_restaurants_cache() -> List[Dict[str, Any]]:
+    """
+    Read the restaurants table once and keep it parsed in memory, sorted by rating
+    (held by st.cache_resource; init_db() clears it).
+    Each entry holds the public row under "row" plus lowercased copies of the
+    filterable fields ("_cuisines_lower", "_seating_lower", "_location_lower").
+    """
+    with _DB_LOCK:
+        cur = _get_conn().cursor()
+        cur.execute(_SQL["restaurants_all"])
+        db_rows = cur.fetchall()
+    entries: List[Dict[str, Any]] = []
+    for row in db_rows:
+        rid, name, cuisines_json, address, city, capacity_max, seating_json, opening_hour, closing_hour, rating = row
+        rest_cuisines = json.loads(cuisines_json)
+        rest_seating = json.loads(seating_json)
+        entries.append({
+            "row": {
+                "id": rid,
+                "name": name,
+                "cuisines": rest_cuisines,
+                "address": address,
+                "city": city,
+                "capacity_max": capacity_max,
+                "seating_types": rest_seating,
+                "opening_hour": opening_hour,
+                "closing_hour": closing_hour,
+                "avg_rating": rating
+            },
+            "_cuisines_lower": frozenset(c.lower() for c in rest_cuisines),
+            "_seating_lower": frozenset(seat.lower() for seat in rest_seating),
+            "_location_lower": f"{address or ''} {city or ''}".strip().lower(),
+        })
+    entries.sort(key=lambda e: e["row"]["avg_rating"] or 0, reverse=True)
+    return entries
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _all_restaurants_sorted() -> List[Dict[str, Any]]:
+    """Public rows of the whole table in rating order, returned as-is for unfiltered searches."""
+    return [entry["row"] for entry in _load_restaurants_cache()]
 
 def fetch_restaurants_from_db(
     cuisines: Optional[List[str]] = None,
@@ -399,52 +731,91 @@ def fetch_restaurants_from_db(
     max_capacity: Optional[int] = None,
     seating_types: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
-    cuisines_set = set([c.lower() for c in cuisines]) if cuisines else None
-    locations_set = set([l.lower() for l in locations]) if locations else None
-    seating_set = set([s.lower() for s in seating_types]) if seating_types else None
+    # no filters (e.g. the manual booking dropdown): return the precomputed full list
+    if not cuisines and not locations and not seating_types and min_capacity is None and max_capacity is None:
+        return _all_restaurants_sorted()
 
+    # filters are typically 1-3 items: lowercase them once into tuples and probe the
+    # cached per-restaurant frozensets instead of building/intersecting sets per row
+    cuisines_set = tuple(c.lower() for c in cuisines) if cuisines else ()
+    locations_set = tuple(l.lower() for l in locations) if locations else ()
+    seating_set = tuple(s.lower() for s in seating_types) if seating_types else ()
+
+    # the cache is already sorted by avg_rating (descending), so filtering keeps the order
     rows: List[Dict[str, Any]] = []
-    with closing(sqlite3.connect(DB_PATH)) as con:
-        cur = con.cursor()
-        cur.execute("SELECT id, name, cuisines_json, address, city, capacity_max, seating_types_json, opening_hour, closing_hour, avg_rating FROM restaurants")
-        for row in cur.fetchall():
-            rid, name, cuisines_json, address, city, capacity_max, seating_json, opening_hour, closing_hour, rating = row
-            rest_cuisines = json.loads(cuisines_json)
-            rest_seating = json.loads(seating_json)
-            location_text = f"{address or ''} {city or ''}".strip().lower()
-
-            if cuisines_set:
-                rest_cuisine_set = set([rc.lower() for rc in rest_cuisines])
-                if not (rest_cuisine_set & cuisines_set):
-                    continue
-            if locations_set:
-                if not any(loc in location_text for loc in locations_set):
-                    continue
-            if min_capacity is not None and capacity_max < min_capacity:
+    for entry in _load_restaurants_cache():
+        capacity_max = entry["row"]["capacity_max"]
+        if cuisines_set and not any(c in entry["_cuisines_lower"] for c in cuisines_set):
+            continue
+        if locations_set:
+            location_text = entry["_location_lower"]
+            if not any(loc in location_text for loc in locations_set):
                 continue
-            if max_capacity is not None and capacity_max > max_capacity:
-                pass
-            if seating_set:
-                rest_seating_set = set([s.lower() for s in rest_seating])
-                if not (rest_seating_set & seating_set):
-                    continue
-
-            rows.append({
-                "id": rid,
-                "name": name,
-                "cuisines": rest_cuisines,
-                "address": address,
-                "city": city,
-                "capacity_max": capacity_max,
-                "seating_types": rest_seating,
-                "opening_hour": opening_hour,
-                "closing_hour": closing_hour,
-                "avg_rating": rating
-            })
-    rows.sort(key=lambda r: r.get("avg_rating", 0), reverse=True)
+        if min_capacity is not None and capacity_max < min_capacity:
+            continue
+        if max_capacity is not None and capacity_max > max_capacity:
+            continue
+        if seating_set and not any(s in entry["_seating_lower"] for s in seating_set):
+            continue
+        rows.append(entry["row"])
     return rows
 
-def check_availability_db(restaurant_id: int, datetime_iso: str, party_size: int) -> Dict[str, Any]:
+@st.cache_resource(ttl=60)
+def _restaurant_choices():
+    """
+    Name -> restaurant map and selectbox options for the manual booking dropdown.
+    Held by st.cache_resource so reruns reuse them (no copy per rerun, unlike st.cache_data);
+    reservations never change the restaurants table, so only init_db() needs to clear it.
+    """
+    restaurants = fetch_restaurants_from_db()
+    rest_map = {r["name"]: r for r in restaurants}
+    rest_names = ["-- choose --"] + [r["name"] for r in restaurants]
+    return rest_map, rest_names
+
+def _slot_capacity(cur: sqlite3.Cursor, restaurant_id: int, datetime_iso: str):
+    """
+    Capacity and confirmed seats for one slot in a single query.
+    Returns (capacity_max, used) or None if the restaurant does not exist. Call with _DB_LOCK held.
+    """
+    cur.execute(_SQL["slot_capacity"], (datetime_iso, restaurant_id))
+    return cur.fetchone()
+
+# short-lived cache of _slot_capacity() results for repeated checkAvailability calls on one slot
+_AVAIL_TTL_SECONDS = 15.0
+_AVAIL_MAX_ENTRIES = 512
+
+@st.cache_resource(show_spinner=False)
+def _avail_cache() -> "OrderedDict[tuple, tuple]":
+    """(restaurant_id, datetime_iso) -> (expires_at, (capacity_max, used)), oldest first. Use with _DB_LOCK held."""
+    return OrderedDict()
+
+def _cached_slot_capacity(restaurant_id: int, datetime_iso: str):
+    """
+    _slot_capacity() on the shared connection, served from _avail_cache() for up to
+    _AVAIL_TTL_SECONDS. Keyed per slot rather than per party size, so a booking or
+    cancellation invalidates exactly one entry (_invalidate_slot). Call with _DB_LOCK held.
+    """
+    cache = _avail_cache()
+    key = (restaurant_id, datetime_iso)
+    now = monotonic()
+    hit = cache.get(key)
+    if hit is not None and hit[0] > now:
+        cache.move_to_end(key)
+        return hit[1]
+    r = _slot_capacity(_get_conn().cursor(), restaurant_id, datetime_iso)
+    if r is not None:
+        cache[key] = (now + _AVAIL_TTL_SECONDS, tuple(r))
+        cache.move_to_end(key)
+        if len(cache) > _AVAIL_MAX_ENTRIES:
+            cache.popitem(last=False)
+    return r
+
+def _invalidate_slot(restaurant_id: int, datetime_iso: str):
+    """Drop the cached capacity of a slot whose confirmed seats just changed. Call with _DB_LOCK held."""
+    _avail_cache().pop((restaurant_id, datetime_iso), None)
+
+def check_availability_db(restaurant_id: int, datetime_iso: str, party_size: int,
+                          conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
     """
     Enhanced availability check that:
      - parses & normalizes datetime using _parse_datetime_with_tz()
@@ -453,27 +824,25 @@ def check_availability_db(restaurant_id: int, datetime_iso: str, party_size: int
     """
     # 1) parse & timezone-normalize the requested datetime
     try:
-        req_dt = _parse_datetime_with_tz(datetime_iso)
+        req_dt, now = _parse_dt_and_now(datetime_iso)
     except ValueError:
         return {"error": "invalid_datetime_format", "available": False}
 
     # 2) reject past datetimes
-    now = _now_in_default_tz()
     if req_dt < now:
         # return both times for debugging/UX
         return {"error": "datetime_in_past", "available": False, "now": now.isoformat(), "requested": req_dt.isoformat()}
 
     # 3) existing capacity checks
-    with closing(sqlite3.connect(DB_PATH)) as con:
-        cur = con.cursor()
-        cur.execute("SELECT capacity_max FROM restaurants WHERE id=?", (restaurant_id,))
-        r = cur.fetchone()
+    with _DB_LOCK:
+        # an explicit conn may point at another database, so only the shared one is cached
+        if conn is None:
+            r = _cached_slot_capacity(restaurant_id, datetime_iso)
+        else:
+            r = _slot_capacity(_resolve_conn(conn).cursor(), restaurant_id, datetime_iso)
         if not r:
             return {"error": "restaurant_not_found", "available": False}
-        capacity_max = r[0]
-        cur.execute("SELECT SUM(party_size) FROM reservations WHERE restaurant_id=? AND datetime_iso=? AND status='confirmed'",
-                    (restaurant_id, datetime_iso))
-        used = cur.fetchone()[0] or 0
+        capacity_max, used = r
         seats_left = max(0, capacity_max - used)
         available = (seats_left >= party_size)
         return {"available": available, "seats_left": seats_left, "capacity_max": capacity_max}
@@ -484,76 +853,109 @@ def make_reservation_db(
     party_size: int,
     user_name: str,
     contact: str,
-    seating_type: Optional[str] = None
+    seating_type: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None
 ) -> Dict[str, Any]:
     """
     Atomic reservation: re-check that requested time isn't in the past; then attempt booking.
     """
     try:
-        req_dt = _parse_datetime_with_tz(datetime_iso)
+        req_dt, now = _parse_dt_and_now(datetime_iso)
     except ValueError:
         return {"error": "invalid_datetime_format"}
-    
+
     # 2) reject past datetimes
-    now = _now_in_default_tz()
     if req_dt < now:
         return {"error": "datetime_in_past", "message": f"Requested time {req_dt.isoformat()} is before current time {now.isoformat()}"}
 
 
-    con = sqlite3.connect(DB_PATH)
+    # capacity check and insert in one statement: SQLite runs each statement atomically,
+    # so no explicit transaction is needed; rowcount 0 means the guard rejected the booking
+    reservation_code = "R" + os.urandom(4).hex().upper()
+    with _DB_LOCK:
+        cur = _resolve_conn(conn).cursor()
+        try:
+            cur.execute(_SQL["insert_if_capacity"], (
+                reservation_code, restaurant_id, datetime_iso, party_size, user_name, contact, seating_type,
+                restaurant_id, restaurant_id, datetime_iso, party_size))
+            if cur.rowcount == 1:
+                _invalidate_slot(restaurant_id, datetime_iso)
+                return {"reservation_code": reservation_code, "status": "confirmed"}
+            # rejected: work out why (only on the failure path)
+            r = _slot_capacity(cur, restaurant_id, datetime_iso)
+            if not r:
+                return {"error": "restaurant_not_found"}
+            capacity_max, used = r
+            return {"error": "no_availability", "seats_left": max(0, capacity_max - used)}
+        except Exception as e:
+            return {"error": "db_error", "message": str(e)}
+
+def reserve_if_available_db(
+    restaurant_id: int,
+    datetime_iso: str,
+    party_size: int,
+    user_name: str,
+    contact: str,
+    seating_type: Optional[str] = None,
+    conn: Optional[sqlite3.Connection] = None
+) -> Dict[str, Any]:
+    """
+    checkAvailability + makeReservation in one call: the capacity read and the insert run in one
+    BEGIN IMMEDIATE transaction, so no other writer can take the seats in between.
+    On success also reports the seats left after this booking.
+    """
     try:
-        con.isolation_level = "EXCLUSIVE"
-        cur = con.cursor()
-        cur.execute("BEGIN EXCLUSIVE")
-        cur.execute("SELECT capacity_max FROM restaurants WHERE id=?", (restaurant_id,))
-        r = cur.fetchone()
-        if not r:
-            con.rollback()
-            return {"error": "restaurant_not_found"}
-        capacity_max = r[0]
-        cur.execute("SELECT SUM(party_size) FROM reservations WHERE restaurant_id=? AND datetime_iso=? AND status='confirmed'",
-                    (restaurant_id, datetime_iso))
-        used = cur.fetchone()[0] or 0
-        seats_left = max(0, capacity_max - used)
-        if seats_left < party_size:
-            con.rollback()
-            return {"error": "no_availability", "seats_left": seats_left}
-        reservation_code = f"R{uuid.uuid4().hex[:8].upper()}"
-        cur.execute("""
-            INSERT INTO reservations
-            (reservation_code, restaurant_id, datetime_iso, party_size, user_name, contact, seating_type, status, created_at)
-            VALUES (?,?,?,?,?,?,?, 'confirmed', datetime('now'))
-        """, (reservation_code, restaurant_id, datetime_iso, party_size, user_name, contact, seating_type))
-        con.commit()
-        return {"reservation_code": reservation_code, "status": "confirmed"}
-    except Exception as e:
-        con.rollback()
-        return {"error": "db_error", "message": str(e)}
-    finally:
-        con.close()
-
-def cancel_reservation_db(reservation_code: str) -> Dict[str, Any]:
-    with closing(sqlite3.connect(DB_PATH)) as con:
-        cur = con.cursor()
-        cur.execute("SELECT status FROM reservations WHERE reservation_code=?", (reservation_code,))
+        req_dt, now = _parse_dt_and_now(datetime_iso)
+    except ValueError:
+        return {"error": "invalid_datetime_format"}
+
+    if req_dt < now:
+        return {"error": "datetime_in_past", "message": f"Requested time {req_dt.isoformat()} is before current time {now.isoformat()}"}
+
+    reservation_code = "R" + os.urandom(4).hex().upper()
+    with _DB_LOCK:
+        cur = _resolve_conn(conn).cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                r = _slot_capacity(cur, restaurant_id, datetime_iso)
+                if not r:
+                    result = {"error": "restaurant_not_found"}
+                else:
+                    capacity_max, used = r
+                    seats_left = max(0, capacity_max - used)
+                    if seats_left < party_size:
+                        result = {"error": "no_availability", "seats_left": seats_left}
+                    else:
+                        cur.execute(_SQL["insert_reservation"], (reservation_code, restaurant_id, datetime_iso, party_size, user_name, contact, seating_type))
+                        result = {"reservation_code": reservation_code, "status": "confirmed", "seats_left": seats_left - party_size}
+                cur.execute("COMMIT")
+                if result.get("status") == "confirmed":
+                    _invalidate_slot(restaurant_id, datetime_iso)
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            return result
+        except Exception as e:
+            return {"error": "db_error", "message": str(e)}
+
+def cancel_reservation_db(reservation_code: str, conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+    with _DB_LOCK:
+        cur = _resolve_conn(conn).cursor()
+        cur.execute(_SQL["reservation_status"], (reservation_code,))
         row = cur.fetchone()
         if not row:
             return {"error": "not_found"}
         if row[0] == "cancelled":
             return {"error": "already_cancelled"}
-        cur.execute("UPDATE reservations SET status='cancelled' WHERE reservation_code=?", (reservation_code,))
-        con.commit()
+        cur.execute(_SQL["cancel_reservation"], (reservation_code,))
+        _invalidate_slot(row[1], row[2])
         return {"status": "cancelled", "reservation_code": reservation_code}
 
-def list_reservations_by_contact(contact: str) -> List[Dict[str, Any]]:
-    with closing(sqlite3.connect(DB_PATH)) as con:
-        cur = con.cursor()
-        cur.execute("""
-            SELECT r.reservation_code, r.datetime_iso, r.party_size, r.user_name, r.status, rest.name
-            FROM reservations r JOIN restaurants rest ON r.restaurant_id = rest.id
-            WHERE r.contact = ?
-            ORDER BY r.datetime_iso DESC
-        """, (contact,))
+def list_reservations_by_contact(contact: str, conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+    with _DB_LOCK:
+        cur = _resolve_conn(conn).cursor()
+        cur.execute(_SQL["reservations_by_contact"], (contact,))
         items = []
         for row in cur.fetchall():
             code, dt_iso, party, name, status, rest_name = row
@@ -570,211 +972,449 @@ def list_reservations_by_contact(contact: str) -> List[Dict[str, Any]]:
 # -----------------------
 # Agent tool metadata & tool execution
 # -----------------------
-def tools_registry():
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "getRestaurants",
-                "description": "Search restaurants by cuisines, locations, min_capacity, max_capacity, seating_types.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "cuisines": {"type": "array", "items": {"type": "string"}},
-                        "locations": {"type": "array", "items": {"type": "string"}},
-                        "min_capacity": {"type": "integer"},
-                        "max_capacity": {"type": "integer"},
-                        "seating_types": {"type": "array", "items": {"type": "string"}}
-                    },
-                    "required": []
-                }
+# static tool schema, built once at import and shared by every hop
+_TOOLS_REGISTRY = (
+    {
+        "type": "function",
+        "function": {
+            "name": "getRestaurants",
+            "description": "Search restaurants by cuisines, locations, min_capacity, max_capacity, seating_types.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "cuisines": {"type": "array", "items": {"type": "string"}},
+                    "locations": {"type": "array", "items": {"type": "string"}},
+                    "min_capacity": {"type": "integer"},
+                    "max_capacity": {"type": "integer"},
+                    "seating_types": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": []
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "checkAvailability",
-                "description": "Check availability for restaurant at datetime_iso for given party_size.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "restaurant_id": {"type": "integer"},
-                        "datetime_iso": {"type": "string"},
-                        "party_size": {"type": "integer"}
-                    },
-                    "required": ["restaurant_id", "datetime_iso", "party_size"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "checkAvailability",
+            "description": "Check availability for restaurant at datetime_iso for given party_size.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "restaurant_id": {"type": "integer"},
+                    "datetime_iso": {"type": "string"},
+                    "party_size": {"type": "integer"}
+                },
+                "required": ["restaurant_id", "datetime_iso", "party_size"]
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "makeReservation",
-                "description": "Make an atomic reservation. Requires restaurant_id, datetime_iso, party_size, user_name, contact.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "restaurant_id": {"type": "integer"},
-                        "datetime_iso": {"type": "string"},
-                        "party_size": {"type": "integer"},
-                        "user_name": {"type": "string"},
-                        "contact": {"type": "string"},
-                        "seating_type": {"type": "string"}
-                    },
-                    "required": ["restaurant_id", "datetime_iso", "party_size", "user_name", "contact"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "makeReservation",
+            "description": "Make an atomic reservation. Requires restaurant_id, datetime_iso, party_size, user_name, contact.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "restaurant_id": {"type": "integer"},
+                    "datetime_iso": {"type": "string"},
+                    "party_size": {"type": "integer"},
+                    "user_name": {"type": "string"},
+                    "contact": {"type": "string"},
+                    "seating_type": {"type": "string"}
+                },
+                "required": ["restaurant_id", "datetime_iso", "party_size", "user_name", "contact"]
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "cancelReservation",
-                "description": "Cancel a previously made reservation by reservation_code.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "reservation_code": {"type": "string"}
-                    },
-                    "required": ["reservation_code"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "reserveIfAvailable",
+            "description": "Check availability and, if the slot has room, book it in one step. Same parameters as makeReservation; on a full slot returns error no_availability with seats_left.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "restaurant_id": {"type": "integer"},
+                    "datetime_iso": {"type": "string"},
+                    "party_size": {"type": "integer"},
+                    "user_name": {"type": "string"},
+                    "contact": {"type": "string"},
+                    "seating_type": {"type": "string"}
+                },
+                "required": ["restaurant_id", "datetime_iso", "party_size", "user_name", "contact"]
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "listReservations",
-                "description": "List reservations by contact (phone/email).",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "contact": {"type": "string"}
-                    },
-                    "required": ["contact"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "cancelReservation",
+            "description": "Cancel a previously made reservation by reservation_code.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "reservation_code": {"type": "string"}
+                },
+                "required": ["reservation_code"]
             }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "sendResponse",
-                "description": "Final response (string) sent to the user to finish the turn.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "response": {"type": "string"}
-                    },
-                    "required": ["response"]
-                }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "listReservations",
+            "description": "List reservations by contact (phone/email).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "contact": {"type": "string"}
+                },
+                "required": ["contact"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "sendResponse",
+            "description": "Final response (string) sent to the user to finish the turn.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "response": {"type": "string"}
+                },
+                "required": ["response"]
             }
         }
-    ]
+    }
+)
+
+def tools_registry():
+    return _TOOLS_REGISTRY
+
+# tool arguments, one model per tool: execute_tool validates (and coerces) the model-supplied
+# dict once, so handlers get typed attributes; extra keys are ignored. The classes are built
+# inside st.cache_resource because a class statement in this script would be re-executed (and
+# the pydantic model rebuilt) on every rerun.
+@st.cache_resource(show_spinner=False)
+def _tool_arg_models() -> Dict[str, type]:
+    """Tool name -> pydantic model for its arguments."""
+    class _GetRestaurantsArgs(BaseModel):
+        cuisines: Optional[List[str]] = None
+        locations: Optional[List[str]] = None
+        min_capacity: Optional[int] = None
+        max_capacity: Optional[int] = None
+        seating_types: Optional[List[str]] = None
+
+    class _CheckAvailabilityArgs(BaseModel):
+        restaurant_id: int
+        datetime_iso: str
+        party_size: int
+
+    class _ReservationArgs(BaseModel):
+        restaurant_id: int
+        # natural-language datetimes are normalized by the handler; "datetime" is accepted as an alias
+        datetime_iso: Optional[str] = None
+        datetime_alt: Optional[str] = Field(None, alias="datetime")
+        party_size: int
+        user_name: str
+        contact: str
+        seating_type: Optional[str] = None
+
+    class _CancelReservationArgs(BaseModel):
+        reservation_code: str
+
+    class _ListReservationsArgs(BaseModel):
+        contact: str
+
+    class _SendResponseArgs(BaseModel):
+        response: Optional[str] = None
+
+    return {
+        "getRestaurants": _GetRestaurantsArgs,
+        "checkAvailability": _CheckAvailabilityArgs,
+        "makeReservation": _ReservationArgs,
+        "reserveIfAvailable": _ReservationArgs,
+        "cancelReservation": _CancelReservationArgs,
+        "listReservations": _ListReservationsArgs,
+        "sendResponse": _SendResponseArgs,
+    }
+
+_TOOL_ARG_MODELS = _tool_arg_models()
+
+# one handler per tool name; each takes its validated args model
+def _tool_get_restaurants(args: BaseModel) -> Any:
+    return fetch_restaurants_from_db(
+        cuisines=args.cuisines,
+        locations=args.locations,
+        min_capacity=args.min_capacity,
+        max_capacity=args.max_capacity,
+        seating_types=args.seating_types
+    )
+
+def _tool_check_availability(args: BaseModel) -> Any:
+    return check_availability_db(
+        restaurant_id=args.restaurant_id,
+        datetime_iso=args.datetime_iso,
+        party_size=args.party_size
+    )
+
+def _book_with_natural_datetime(book: Callable[..., Dict[str, Any]], args: BaseModel) -> Any:
+    """Shared by makeReservation and reserveIfAvailable: normalize the datetime, then call book()."""
+    # Accept LLM-provided datetime strings like "today 7pm", "7pm", "2025-11-10 19:00"
+    raw_dt = args.datetime_iso or args.datetime_alt or ""
+    normalized_iso, debug = _normalize_natural_datetime(raw_dt)
+    # attach debug info in server logs and also return to caller when failing
+    if normalized_iso is None:
+        # return a structured error so the LLM can ask a clarifying question
+        return {"error": "unparseable_datetime", "debug": debug}
+    # call backend using normalized ISO (YYYY-MM-DD HH:MM)
+    return book(
+        restaurant_id=args.restaurant_id,
+        datetime_iso=normalized_iso,
+        party_size=args.party_size,
+        user_name=args.user_name,
+        contact=args.contact,
+        seating_type=args.seating_type
+    )
+
+def _tool_make_reservation(args: BaseModel) -> Any:
+    return _book_with_natural_datetime(make_reservation_db, args)
+
+def _tool_reserve_if_available(args: BaseModel) -> Any:
+    return _book_with_natural_datetime(reserve_if_available_db, args)
+
+def _tool_cancel_reservation(args: BaseModel) -> Any:
+    return cancel_reservation_db(args.reservation_code)
+
+def _tool_list_reservations(args: BaseModel) -> Any:
+    return list_reservations_by_contact(args.contact)
+
+def _tool_send_response(args: BaseModel) -> Any:
+    return args.response
+
+# tool name -> handler; the args model comes from _TOOL_ARG_MODELS
+_DISPATCH = {
+    "getRestaurants": _tool_get_restaurants,
+    "checkAvailability": _tool_check_availability,
+    "makeReservation": _tool_make_reservation,
+    "reserveIfAvailable": _tool_reserve_if_available,
+    "cancelReservation": _tool_cancel_reservation,
+    "listReservations": _tool_list_reservations,
+    "sendResponse": _tool_send_response,
+}
 
 def execute_tool(tool_name: str, args: Dict[str, Any]) -> Any:
-    if tool_name == "getRestaurants":
-        return fetch_restaurants_from_db(
-            cuisines=args.get("cuisines"),
-            locations=args.get("locations"),
-            min_capacity=args.get("min_capacity"),
-            max_capacity=args.get("max_capacity"),
-            seating_types=args.get("seating_types")
-        )
-    if tool_name == "checkAvailability":
-        return check_availability_db(
-            restaurant_id=int(args["restaurant_id"]),
-            datetime_iso=str(args["datetime_iso"]),
-            party_size=int(args["party_size"])
-        )
-    if tool_name == "makeReservation":
-        # Accept LLM-provided datetime strings like "today 7pm", "7pm", "2025-11-10 19:00"
-        raw_dt = str(args.get("datetime_iso") or args.get("datetime") or "")
-        normalized_iso, debug = _normalize_natural_datetime(raw_dt)
-        # attach debug info in server logs and also return to caller when failing
-        if normalized_iso is None:
-            # return a structured error so the LLM can ask a clarifying question
-            return {"error": "unparseable_datetime", "debug": debug}
-        # call backend using normalized ISO (YYYY-MM-DD HH:MM)
-        return make_reservation_db(
-            restaurant_id=int(args["restaurant_id"]),
-            datetime_iso=normalized_iso,
-            party_size=int(args["party_size"]),
-            user_name=str(args["user_name"]),
-            contact=str(args["contact"]),
-            seating_type=args.get("seating_type")
-        )
-    if tool_name == "cancelReservation":
-        return cancel_reservation_db(args["reservation_code"])
-    if tool_name == "listReservations":
-        return list_reservations_by_contact(args["contact"])
-    if tool_name == "sendResponse":
-        return args.get("response")
-    return {"error": "unknown_tool"}
+    handler = _DISPATCH.get(tool_name)
+    if handler is None:
+        return {"error": "unknown_tool"}
+    try:
+        parsed = _TOOL_ARG_MODELS[tool_name].model_validate(args)
+    except ValidationError as e:
+        # structured error (like unparseable_datetime) so the LLM can correct its call
+        return {"error": "invalid_arguments", "message": str(e)}
+    return handler(parsed)
 
 # -----------------------
 # Multi-hop process (non-interactive)
 # -----------------------
-def process_user_input(user_input: str, conversation_history: List[Dict[str, Any]], model: str = "gpt-4o"):
+@st.cache_resource(show_spinner=False)
+def _async_client() -> AsyncOpenAI:
     """
-    Sends user_input + conversation_history to model with tool registry,
-    executes any tool_calls the model returns (ensures assistant->tool pairing),
-    and continues multi-hop until model calls sendResponse or returns no tool_calls.
-    Returns the final assistant text and updated conversation_history.
+    One AsyncOpenAI client per server process, so every turn and hop reuses its connection pool.
+    The pool speaks HTTP/2 when h2 is installed, multiplexing concurrent requests over one TLS
+    connection. DefaultAsyncHttpxClient keeps the SDK's own pool limits and redirect settings.
+    Created lazily because the constructor rejects a missing OPENAI_API_KEY.
     """
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    tools = tools_registry()
+    http_client = DefaultAsyncHttpxClient(http2=HTTP2_AVAILABLE)
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client, timeout=30.0)
+
+@st.cache_resource
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop on a daemon thread. The shared client's pooled connections belong
+    to the loop that opened them, so all turns run here rather than in a fresh asyncio.run() loop.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return loop
+
+def _submit_async(coro):
+    """Schedule coro on _event_loop(); returns a concurrent.futures.Future the script thread can wait on."""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop())
+
+# tool-call (de)serialization: orjson when installed, stdlib json otherwise
+if ORJSON_AVAILABLE:
+    def _loads_args(raw: Optional[str]) -> Dict[str, Any]:
+        return orjson.loads(raw or "{}")
+
+    def _dumps_result(result: Any) -> str:
+        return orjson.dumps(result).decode()
+else:
+    def _loads_args(raw: Optional[str]) -> Dict[str, Any]:
+        return json.loads(raw or "{}")
+
+    def _dumps_result(result: Any) -> str:
+        return json.dumps(result)
+
+# tools without side effects; consecutive calls to these within one hop run concurrently
+_READ_ONLY_TOOLS = frozenset({"getRestaurants", "checkAvailability", "listReservations"})
 
-    system_message = (
+async def _execute_tool_calls(tool_calls) -> List[Any]:
+    """
+    Execute one hop's tool_calls and return their results in the same order.
+    Runs of consecutive read-only calls are gathered concurrently (each in a worker thread,
+    since the DB helpers are blocking); mutating calls run alone, in their original position,
+    so e.g. checkAvailability -> makeReservation in one hop still sees the right order.
+    """
+    results: List[Any] = [None] * len(tool_calls)
+    batch: List[int] = []
+
+    async def flush():
+        outs = await asyncio.gather(*(
+            asyncio.to_thread(execute_tool, tool_calls[i].function.name, _loads_args(tool_calls[i].function.arguments))
+            for i in batch
+        ))
+        for i, out in zip(batch, outs):
+            results[i] = out
+        batch.clear()
+
+    for i, tool_call in enumerate(tool_calls):
+        if tool_call.function.name in _READ_ONLY_TOOLS:
+            batch.append(i)
+            continue
+        await flush()
+        results[i] = await asyncio.to_thread(
+            execute_tool, tool_call.function.name, _loads_args(tool_call.function.arguments))
+    await flush()
+    return results
+
+async def _complete_streamed(client: AsyncOpenAI, messages: List[Any], tools, model: str,
+                             on_text: Optional[Callable[[str], None]] = None) -> ChatCompletionMessage:
+    """
+    One chat completion with stream=True, reassembled into a ChatCompletionMessage.
+    Content deltas are passed to on_text as they arrive. The first getRestaurants tool_call delta
+    starts warming the restaurants cache in a worker thread while the rest of the stream (the
+    call's arguments) is still arriving; the warm-up is awaited before returning and its
+    result discarded.
+    """
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        tools=tools,
+        tool_choice="auto",
+        stream=True
+    )
+    content_parts: List[str] = []
+    calls: Dict[int, Dict[str, Any]] = {}
+    prefetch = None
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            if on_text is not None:
+                on_text(delta.content)
+        for tc in delta.tool_calls or ():
+            call = calls.setdefault(tc.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function is not None:
+                call["function"]["name"] += tc.function.name or ""
+                call["function"]["arguments"] += tc.function.arguments or ""
+                if prefetch is None and call["function"]["name"] == "getRestaurants":
+                    prefetch = asyncio.create_task(asyncio.to_thread(_load_restaurants_cache))
+    if prefetch is not None:
+        # speculative only: a failed warm-up surfaces again when the tool itself runs
+        await asyncio.gather(prefetch, return_exceptions=True)
+    return ChatCompletionMessage(
+        role="assistant",
+        content="".join(content_parts) or None,
+        tool_calls=[calls[i] for i in sorted(calls)] or None
+    )
+
+# system prompt shared by every turn; the SDK only reads messages, so one dict is reused
+_SYSTEM_MSG = {
+    "role": "system",
+    "content": (
         "You are a reservation assistant. FIRST decide the user's intent: one of "
         "['search', 'check_availability', 'reserve', 'cancel', 'list']. Then call tools "
-        "(getRestaurants, checkAvailability, makeReservation, cancelReservation, listReservations) as needed. "
+        "(getRestaurants, checkAvailability, reserveIfAvailable, makeReservation, cancelReservation, listReservations) as needed. "
+        "To book, prefer reserveIfAvailable: it checks availability and reserves in one step. "
         "Never call makeReservation without first calling checkAvailability for that restaurant+slot. "
         "When you have a final user-facing reply, call sendResponse(response). Use ISO datetime 'YYYY-MM-DD HH:MM'. "
         "If ambiguous, ask a brief clarifying question."
     )
+}
 
-    # build messages
-    messages = [{"role": "system", "content": system_message}]
-    messages.extend(conversation_history)
-    messages.append({"role": "user", "content": user_input})
-
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        tools=tools,
-        tool_choice="auto"
-    )
+# conversation_history is resent on every hop; older messages beyond this are folded into one
+# "Earlier context" system message so prompt size stays bounded across turns
+_MAX_HISTORY = 20
+_SUMMARY_PREFIX = "Earlier context (summarized): "
+_SUMMARY_MAX_CHARS = 2000
 
-    conversation_history.append({"role": "user", "content": user_input})
-    response_message = response.choices[0].message
+def _trim_history(history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keep at most the last _MAX_HISTORY messages, cut at a user message so an assistant
+    tool_calls message is never separated from its tool results (if the current turn alone
+    is longer, it is kept whole). The dropped head, plus any earlier summary, becomes a
+    heuristic summary of its user/assistant text: no extra model call.
+    """
+    if len(history) <= _MAX_HISTORY:
+        return history
+    starts = [i for i, m in enumerate(history) if m.get("role") == "user"]
+    cut = next((i for i in starts if i >= len(history) - _MAX_HISTORY), starts[-1] if starts else 0)
+    if cut == 0:
+        return history
+    lines: List[str] = []
+    for m in history[:cut]:
+        content = m.get("content") or ""
+        if m.get("role") == "system" and content.startswith(_SUMMARY_PREFIX):
+            lines.append(content[len(_SUMMARY_PREFIX):])
+        elif m.get("role") in ("user", "assistant") and content and not m.get("tool_calls"):
+            lines.append(f"{m['role']}: {content[:200]}")
+    summary = "\n".join(lines)[-_SUMMARY_MAX_CHARS:]
+    return [{"role": "system", "content": _SUMMARY_PREFIX + summary}, *history[cut:]]
+
+async def process_user_input(user_input: str, conversation_history: List[Dict[str, Any]], model: str = "gpt-4o",
+                             on_text: Optional[Callable[[str], None]] = None):
+    """
+    Sends user_input + conversation_history to model with tool registry,
+    executes any tool_calls the model returns (ensures assistant->tool pairing),
+    and continues multi-hop until model calls sendResponse or returns no tool_calls.
+    Returns the final assistant text and updated conversation_history.
+    Responses are streamed; on_text, if given, receives assistant text deltas as they arrive.
+    """
+    client = _async_client()
+    tools = tools_registry()
 
-    # if no tool_calls, treat content as final assistant response
-    if not getattr(response_message, "tool_calls", None):
-        final_text = (response_message.content or "").strip()
-        if final_text:
-            conversation_history.append({"role": "assistant", "content": final_text})
-        return final_text, conversation_history
+    # one list for the whole turn; the updated history is everything after the system prompt
+    messages = [_SYSTEM_MSG, *_trim_history(conversation_history),
+                {"role": "user", "content": user_input}]
 
-    # process tool calls sequentially just like the CLI agent
-    while getattr(response_message, "tool_calls", None):
+    response_message = await _complete_streamed(client, messages, tools, model, on_text)
+    while response_message.tool_calls:
         tool_calls = response_message.tool_calls
-        for tool_call in tool_calls:
-            fname = tool_call.function.name
-            args = json.loads(tool_call.function.arguments or "{}")
+        # sendResponse ends the turn: calls after the first one are never executed, and the
+        # hop that carries it returns without another model round-trip
+        send_index = next((i for i, tc in enumerate(tool_calls) if tc.function.name == "sendResponse"), None)
+        if send_index is not None:
+            tool_calls = tool_calls[:send_index + 1]
 
-            # append assistant message with tool_call
-            messages.append({
-                "role": "assistant",
-                "content": response_message.content or "",
-                "tool_calls": [tool_call]
-            })
-            conversation_history.append({
-                "role": "assistant",
-                "content": response_message.content or "",
-                "tool_calls": [tool_call]
-            })
+        results = await _execute_tool_calls(tool_calls)
 
-            # execute tool
-            result = execute_tool(fname, args)
-            tool_content = json.dumps(result) if not isinstance(result, str) else result
+        # one assistant message carrying every executed tool_call, then one tool message per
+        # call in the model's original order (the pairing the chat API expects)
+        messages.append({
+            "role": "assistant",
+            "content": response_message.content or "",
+            "tool_calls": list(tool_calls)
+        })
+
+        for tool_call, result in zip(tool_calls, results):
+            tool_content = _dumps_result(result) if not isinstance(result, str) else result
 
             # append tool message
             messages.append({
@@ -782,34 +1422,21 @@ def process_user_input(user_input: str, conversation_history: List[Dict[str, Any
                 "tool_call_id": tool_call.id,
                 "content": tool_content
             })
-            conversation_history.append({
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "content": tool_content
-            })
 
-            # If tool was sendResponse, print and finish
-            if fname == "sendResponse":
-                # result is the response string (tool_content)
-                conversation_history.append({"role": "assistant", "content": tool_content})
-                return tool_content, conversation_history
+        if send_index is not None:
+            # the last tool message holds sendResponse's result: the final response string
+            final_text = messages[-1]["content"]
+            messages.append({"role": "assistant", "content": final_text})
+            return final_text, messages[1:]
 
         # call model for next hop
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto"
-        )
-        response_message = response.choices[0].message
-        if not getattr(response_message, "tool_calls", None):
-            final_text = (response_message.content or "").strip()
-            if final_text:
-                conversation_history.append({"role": "assistant", "content": final_text})
-            return final_text, conversation_history
+        response_message = await _complete_streamed(client, messages, tools, model, on_text)
 
-    # fallback
-    return "", conversation_history
+    # no tool_calls: treat content as the final assistant response
+    final_text = (response_message.content or "").strip()
+    if final_text:
+        messages.append({"role": "assistant", "content": final_text})
+    return final_text, messages[1:]
 
 # -----------------------
 # Streamlit UI
@@ -817,7 +1444,7 @@ def process_user_input(user_input: str, conversation_history: List[Dict[str, Any
 st.set_page_config(page_title="Reservation Agent", layout="wide")
 st.title("🍽️ Reservation Agent (Streamlit + LLM)")
 
-init_db(DB_PATH)
+_init_once()
 
 # Session state
 if "history" not in st.session_state:
@@ -834,7 +1461,22 @@ with col1:
         if not OPENAI_API_KEY:
             st.error("OPENAI_API_KEY not set in environment.")
         else:
-            assistant_text, st.session_state.history = process_user_input(user_query, st.session_state.history)
+            # the turn runs on the LLM loop thread and hands streamed text back through a queue;
+            # it is rendered live here and replaced by the chat log below once the turn ends
+            chunks: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+            future = _submit_async(process_user_input(user_query, st.session_state.history, on_text=chunks.put))
+
+            def _drain():
+                while not future.done() or not chunks.empty():
+                    try:
+                        yield chunks.get(timeout=0.05)
+                    except queue.Empty:
+                        pass
+
+            live = st.empty()
+            live.write_stream(_drain())
+            live.empty()
+            assistant_text, st.session_state.history = future.result()
             st.session_state.chat_display.append(("User", user_query))
             st.session_state.chat_display.append(("Assistant", assistant_text or "—"))
     if st.session_state.chat_display:
@@ -847,10 +1489,13 @@ with col1:
 with col2:
     st.subheader("Manual Booking")
 
-    # Fetch restaurants for dropdown
-    restaurants = fetch_restaurants_from_db()
-    rest_map = {r["name"]: r for r in restaurants}
-    rest_names = ["-- choose --"] + [r["name"] for r in restaurants]
+    # manual-form feedback shows up in this placeholder; it is filled from manual_status (see
+    # _set_status) at the end of this column. A confirmed booking reruns the script to clear the
+    # inputs, and its status survives that rerun in session_state
+    status_ph = st.empty()
+
+    # Restaurants for dropdown (cached across reruns)
+    rest_map, rest_names = _restaurant_choices()
     sel_rest = st.selectbox("Restaurant", rest_names, key="manual_rest_select")
 
     party_size = st.number_input("Party size", min_value=1, max_value=50, value=2, key="manual_party_size")
@@ -870,7 +1515,7 @@ with col2:
         st.warning(parse_err)
     else:
         # show friendly confirmation of parsed datetime in default tz
-        display_dt = parsed_dt.isoformat() if ZONE_INFO_AVAILABLE else parsed_dt.strftime("%Y-%m-%d %H:%M")
+        display_dt = _format_dt(parsed_dt)
         if is_past:
             st.error(f"Requested datetime {display_dt} is in the past. Please pick a future time.")
         else:
@@ -913,32 +1558,21 @@ with col2:
             st.write("Debug: reservation response ->", res)
 
             if res.get("error") == "invalid_datetime_format":
-                # capture the error in session and rerun so top-of-page displays it
-                st.session_state["last_error"] = "Server rejected datetime format. Use YYYY-MM-DD HH:MM."
-                st.session_state["last_error_payload"] = res
-                st.rerun()
+                _set_status("error", "Server rejected datetime format. Use YYYY-MM-DD HH:MM.", res)
             elif res.get("error") == "datetime_in_past":
-                st.session_state["last_error"] = "Server rejected the request: requested datetime is in the past."
-                st.session_state["last_error_payload"] = res
-                st.rerun()
+                _set_status("error", "Server rejected the request: requested datetime is in the past.", res)
             elif res.get("error") == "no_availability":
-                st.session_state["last_error"] = f"No availability. Seats left: {res.get('seats_left')}"
-                st.session_state["last_error_payload"] = res
-                st.rerun()
+                _set_status("error", f"No availability. Seats left: {res.get('seats_left')}", res)
             elif res.get("reservation_code"):
                 # Save success message & payload to session_state BEFORE rerun so it survives reload
-                success_msg = f"Reservation confirmed: {res['reservation_code']} at {rest['name']} on {dt_iso} for {party_size} people."
-                st.session_state["last_success"] = success_msg
-                st.session_state["last_success_payload"] = res
+                _set_status("success", f"Reservation confirmed: {res['reservation_code']} at {rest['name']} on {dt_iso} for {party_size} people.", res)
                 # set clear flag so inputs are cleared on next run
                 st.session_state["clear_manual_after"] = True
-                # rerun (will show the success message at the top due to the code in step 1)
+                # rerun (status_ph shows the success message on the next run)
                 st.rerun()
             else:
                 # Unexpected fallback — show error details
-                st.session_state["last_error"] = "Failed to make reservation (unknown error)."
-                st.session_state["last_error_payload"] = res
-                st.rerun()
+                _set_status("error", "Failed to make reservation (unknown error).", res)
 
     
     st.write("---")
@@ -956,19 +1590,16 @@ with col2:
             st.warning("Enter reservation code above.")
         else:
             out = cancel_reservation_db(cancel_code)
-            # Save success/error to show after rerun
             if out.get("status") == "cancelled":
-                st.session_state["last_success"] = f"Reservation {cancel_code} cancelled."
-                st.session_state["last_success_payload"] = out
-                # set flag to clear the cancel input on next run
-                st.session_state["clear_cancel_after"] = True
-                st.rerun()
+                _set_status("success", f"Reservation {cancel_code} cancelled.", out)
             else:
                 # surface the error and keep the input so user can correct it
-                st.session_state["last_error"] = f"Failed to cancel: {out.get('error', out)}"
-                st.session_state["last_error_payload"] = out
-                st.rerun()
-    
+                _set_status("error", f"Failed to cancel: {out.get('error', out)}", out)
+
+    # the one place manual_status is read: this run's outcome, or the one carried over a rerun
+    status = st.session_state.pop("manual_status", None)
+    if status:
+        _show_status(status_ph, **status)
 
 st.write("---")
 st.caption("This demo uses the LLM to parse intent and call tools; manual form calls DB functions directly for convenience.")